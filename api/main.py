@@ -1,336 +1,657 @@
-import sys
-import os
-
-# Fix import path
-current_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(current_dir)
-sys.path.insert(0, parent_dir)
-
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict
-import shutil
-from pathlib import Path
-
-from src.ingestion import DocumentIngestion
-from src.rag import RAGSystem
-from src.quiz_generator import QuizGenerator
-
-# Initialize FastAPI
-app = FastAPI(
-    title="AI Study Assistant API",
-    description="RAG-powered study assistant using Ollama (100% FREE)",
-    version="1.0.0"
-)
-
-# CORS middleware for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Global instances
-ingestion = DocumentIngestion()
-vector_store = None
-rag_system = None
-quiz_generator = None
-
-UPLOAD_DIR = os.path.join(parent_dir, "data", "uploads")
-VECTOR_STORE_NAME = "study_materials"
-
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-
-# Pydantic models for request validation
-class QuestionRequest(BaseModel):
-    question: str
-    k: int = 5
-
-
-class SummarizeRequest(BaseModel):
-    topic: Optional[str] = None
-    summary_type: str = "bullets"
-    k: int = 10
-
-
-class QuizRequest(BaseModel):
-    topic: str
-    num_questions: int = 10
-    difficulty: str = "medium"
-
-
-class GradeQuizRequest(BaseModel):
-    questions: List[Dict]
-    user_answers: Dict[int, str]
-
-
-# API Endpoints
-
-@app.get("/")
-def root():
-    """Health check and status endpoint"""
-    return {
-        "message": "AI Study Assistant API - Powered by Ollama",
-        "status": "running",
-        "documents_loaded": vector_store is not None,
-        "ollama_url": "http://localhost:11434",
-        "endpoints": {
-            "upload": "/upload",
-            "ask": "/ask",
-            "summarize": "/summarize",
-            "definitions": "/definitions",
-            "quiz_generate": "/quiz/generate",
-            "quiz_grade": "/quiz/grade",
-            "documents": "/documents"
-        }
-    }
-
-
-@app.post("/upload")
-async def upload_document(file: UploadFile = File(...)):
-    """Upload and process a document (PDF or TXT)"""
-    global vector_store, rag_system, quiz_generator
-    
-    try:
-        print(f"\n{'='*60}")
-        print(f"FILE UPLOAD REQUEST")
-        print(f"{'='*60}")
-        print(f"Filename: {file.filename}")
-        print(f"Content Type: {file.content_type}")
-        
-        # Validate file type
-        file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in ['.pdf', '.txt']:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {file_extension}. Only .pdf and .txt are supported."
-            )
-        
-        # Save uploaded file
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        print(f"Saving to: {file_path}")
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        print(f"✓ File saved")
-        
-        # Process document
-        print("Processing document...")
-        chunks = ingestion.process_documents(file_path)
-        
-        if not chunks:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to extract content from document"
-            )
-        
-        # Create or update vector store
-        try:
-            if vector_store is None:
-                print("Creating new vector store...")
-                vector_store = ingestion.create_vector_store(chunks, VECTOR_STORE_NAME)
-            else:
-                print("Updating existing vector store...")
-                ingestion.add_documents_to_existing_store(chunks, VECTOR_STORE_NAME)
-                vector_store = ingestion.load_vector_store(VECTOR_STORE_NAME)
-        except Exception as e:
-            print(f"Vector store error: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create/update vector store: {str(e)}"
-            )
-        
-        # Initialize RAG and Quiz systems
-        print("Initializing RAG and Quiz systems...")
-        rag_system = RAGSystem(vector_store)
-        quiz_generator = QuizGenerator(vector_store)
-        
-        print(f"✓ Upload complete!")
-        print(f"{'='*60}\n")
-        
-        return {
-            "message": "Document uploaded and processed successfully",
-            "filename": file.filename,
-            "chunks_created": len(chunks),
-            "status": "success"
-        }
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"✗ Upload failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
-
-
-@app.post("/ask")
-def ask_question(request: QuestionRequest):
-    """Ask a question using RAG"""
-    if rag_system is None:
-        raise HTTPException(
-            status_code=400, 
-            detail="No documents uploaded yet. Please upload documents first."
-        )
-    
-    try:
-        print(f"\n[Q&A REQUEST] {request.question}")
-        result = rag_system.ask_question(request.question, k=request.k)
-        print(f"[Q&A RESPONSE] Generated answer with {len(result['sources'])} sources")
-        return result
-    except Exception as e:
-        print(f"✗ Q&A failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Question answering failed: {str(e)}")
-
-
-@app.post("/summarize")
-def summarize(request: SummarizeRequest):
-    """Summarize content from uploaded documents"""
-    if rag_system is None:
-        raise HTTPException(
-            status_code=400, 
-            detail="No documents uploaded yet. Please upload documents first."
-        )
-    
-    try:
-        print(f"\n[SUMMARY REQUEST] Type: {request.summary_type}, Topic: {request.topic}")
-        result = rag_system.summarize(
-            query=request.topic,
-            summary_type=request.summary_type,
-            k=request.k
-        )
-        print(f"[SUMMARY RESPONSE] Generated from {len(result['sources'])} sources")
-        return result
-    except Exception as e:
-        print(f"✗ Summarization failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
-
-
-@app.post("/definitions")
-def get_definitions(topic: str = "definitions terms concepts"):
-    """Extract key definitions and terms from uploaded materials"""
-    if rag_system is None:
-        raise HTTPException(
-            status_code=400, 
-            detail="No documents uploaded yet. Please upload documents first."
-        )
-    
-    try:
-        print(f"\n[DEFINITIONS REQUEST] Topic: {topic}")
-        result = rag_system.extract_definitions(query=topic)
-        print(f"[DEFINITIONS RESPONSE] Extracted from {len(result['sources'])} sources")
-        return result
-    except Exception as e:
-        print(f"✗ Definition extraction failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Definition extraction failed: {str(e)}")
-
-
-@app.post("/quiz/generate")
-def generate_quiz(request: QuizRequest):
-    """Generate a quiz from uploaded materials"""
-    if quiz_generator is None:
-        raise HTTPException(
-            status_code=400, 
-            detail="No documents uploaded yet. Please upload documents first."
-        )
-    
-    try:
-        print(f"\n[QUIZ REQUEST] Topic: {request.topic}, Questions: {request.num_questions}, Difficulty: {request.difficulty}")
-        
-        quiz = quiz_generator.generate_quiz(
-            topic=request.topic,
-            num_questions=request.num_questions,
-            difficulty=request.difficulty
-        )
-        
-        if "error" in quiz:
-            raise HTTPException(status_code=500, detail=quiz["error"])
-        
-        print(f"[QUIZ RESPONSE] Generated {len(quiz.get('questions', []))} questions")
-        return quiz
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"✗ Quiz generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Quiz generation failed: {str(e)}")
-
-
-@app.post("/quiz/grade")
-def grade_quiz(request: GradeQuizRequest):
-    """Grade a quiz submission"""
-    if quiz_generator is None:
-        raise HTTPException(
-            status_code=400, 
-            detail="No documents uploaded yet. Please upload documents first."
-        )
-    
-    try:
-        print(f"\n[QUIZ GRADING] Grading {len(request.questions)} questions")
-        results = quiz_generator.grade_quiz(request.questions, request.user_answers)
-        print(f"[QUIZ GRADING] Score: {results['score']}%")
-        return results
-    except Exception as e:
-        print(f"✗ Quiz grading failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Quiz grading failed: {str(e)}")
-
-
-@app.get("/documents")
-def list_documents():
-    """List all uploaded documents"""
-    try:
-        files = [f for f in os.listdir(UPLOAD_DIR) if os.path.isfile(os.path.join(UPLOAD_DIR, f))]
-        return {
-            "documents": files,
-            "count": len(files)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}")
-
-
-@app.delete("/reset")
-def reset_system():
-    """Reset the system (clear all data)"""
-    global vector_store, rag_system, quiz_generator
-    
-    try:
-        # Clear uploads
-        for file in os.listdir(UPLOAD_DIR):
-            file_path = os.path.join(UPLOAD_DIR, file)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-        
-        # Clear vector store
-        vector_store_path = os.path.join(parent_dir, "data", "vector_store", VECTOR_STORE_NAME)
-        if os.path.exists(vector_store_path):
-            shutil.rmtree(vector_store_path)
-        
-        # Reset globals
-        vector_store = None
-        rag_system = None
-        quiz_generator = None
-        
-        return {
-            "message": "System reset successfully",
-            "status": "success"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Reset failed: {str(e)}")
-
-
-# Run the API
-if __name__ == "__main__":
-    import uvicorn
-    
-    print("\n" + "="*60)
-    print("AI STUDY ASSISTANT API")
-    print("="*60)
-    print("Powered by: Ollama")
-    print("Starting server on: http://localhost:8000")
-    print("API Docs: http://localhost:8000/docs")
-    print("="*60 + "\n")
-    
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+import sys
+import os
+
+# Fix import path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+
+import aiofiles
+import cachetools
+import requests
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional, Dict
+import shutil
+from pathlib import Path
+
+from src.ingestion import DocumentIngestion
+from src.rag import RAGSystem
+from src.quiz_generator import QuizGenerator
+
+# One buffered log record per event instead of multi-line print banners;
+# %s args are only formatted when the level is enabled
+logger = logging.getLogger("study_assistant")
+logger.setLevel(logging.INFO)
+
+# Initialize FastAPI (orjson serializes the large answer/sources payloads
+# several times faster than stdlib json and emits bytes directly)
+app = FastAPI(
+    title="AI Study Assistant API",
+    description="RAG-powered study assistant using Ollama (100% FREE)",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
+
+# CORS middleware for frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Compress the multi-KB answer/sources payloads for remote clients;
+# responses under 1 KB aren't worth the gzip overhead
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Global instances
+ingestion = DocumentIngestion()
+vector_store = None
+rag_system = None
+quiz_generator = None
+
+UPLOAD_DIR = os.path.join(parent_dir, "data", "uploads")
+VECTOR_STORE_NAME = "study_materials"
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024  # 100 MB
+
+# Maps content digest -> {filename, chunks} so re-uploading the same
+# document doesn't re-embed it
+MANIFEST_PATH = os.path.join(parent_dir, "data", "upload_manifest.json")
+
+OLLAMA_URL = "http://localhost:11434"
+LLM_MODEL = "llama3.2"
+EMBED_MODEL = "nomic-embed-text"
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# Response cache for the read-only LLM endpoints. Keys include the vector
+# store version so entries die automatically when documents change.
+_qa_cache = cachetools.LRUCache(maxsize=512)
+vector_store_version = 0
+
+# Generated quizzes, kept server-side for an hour so grading can be done
+# by id instead of round-tripping full questions (with answers) to the client
+_quiz_cache = cachetools.TTLCache(maxsize=1024, ttl=3600)
+
+
+def _load_manifest() -> Dict:
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(manifest: Dict):
+    # Write-then-rename so a crash can't leave a half-written manifest
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def _invalidate_cache():
+    """Bump the store version and drop cached answers (call after upload/reset)"""
+    global vector_store_version
+    vector_store_version += 1
+    _qa_cache.clear()
+
+
+# Writers (/upload, /reset) mutate the three globals above; serialize
+# them so a concurrent upload and reset can't interleave and leave
+# rag_system pointing at a store that was just deleted. Readers snapshot
+# the globals into locals instead of taking the lock.
+state_lock = asyncio.Lock()
+
+# Readiness gate: set once documents are loaded, cleared on reset.
+# Requests arriving while the system is warming up wait briefly instead
+# of failing fast, so clients don't need their own retry loops.
+ready_event = asyncio.Event()
+
+
+async def _require_ready():
+    """Block up to 1 s for the RAG/quiz systems, then 503 with Retry-After"""
+    try:
+        await asyncio.wait_for(ready_event.wait(), timeout=1.0)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="No documents loaded yet. Upload documents or retry shortly.",
+            headers={"Retry-After": "2"}
+        )
+
+
+# Micro-batching for LLM-bound endpoints: requests that arrive within a
+# short window are dispatched to Ollama together instead of one at a time,
+# so concurrent students share the warm model instead of queueing serially.
+MAX_BATCH = 8
+MAX_WAIT_MS = 30
+
+
+class BatchCoordinator:
+    """Collects (function, args) pairs from handlers and runs them as a batch"""
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: int = MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: Optional[asyncio.Queue] = None
+        self._task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, func, *args, **kwargs):
+        """Enqueue a blocking call and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((func, args, kwargs, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block for the first request, then keep draining until the
+            # batch is full or the wait window closes
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            if len(batch) > 1:
+                logger.info("Dispatching %d LLM requests as one batch", len(batch))
+
+            results = await asyncio.gather(
+                *[asyncio.to_thread(func, *args, **kwargs) for func, args, kwargs, _ in batch],
+                return_exceptions=True
+            )
+            for (_, _, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+llm_batcher = BatchCoordinator()
+
+
+@app.on_event("startup")
+async def start_batcher():
+    llm_batcher.start()
+
+
+def _warmup_models():
+    """Fire tiny generate/embed requests so Ollama loads both models now,
+    not on the first user request (cold load can take 5-30 s)"""
+    try:
+        requests.post(
+            f"{OLLAMA_URL}/api/generate",
+            json={"model": LLM_MODEL, "prompt": "hi", "keep_alive": "30m", "options": {"num_predict": 1}},
+            timeout=120
+        )
+        requests.post(
+            f"{OLLAMA_URL}/api/embed",
+            json={"model": EMBED_MODEL, "input": "hi", "keep_alive": "30m"},
+            timeout=120
+        )
+        logger.info("Ollama models warmed up: %s, %s", LLM_MODEL, EMBED_MODEL)
+    except Exception as e:
+        logger.warning("Model warmup failed (is Ollama running?): %s", e)
+
+
+@app.on_event("startup")
+async def warmup_models():
+    # Run in the background so startup isn't blocked on a cold model load
+    asyncio.create_task(asyncio.to_thread(_warmup_models))
+
+
+@app.on_event("startup")
+async def load_existing_store():
+    """Reload a persisted vector store so a restart doesn't force re-upload"""
+    global vector_store, rag_system, quiz_generator
+
+    store_path = os.path.join(parent_dir, "data", "vector_store", VECTOR_STORE_NAME)
+    if not os.path.exists(store_path):
+        return
+
+    try:
+        async with state_lock:
+            vector_store = await asyncio.to_thread(ingestion.load_vector_store, VECTOR_STORE_NAME)
+            rag_system = RAGSystem(vector_store)
+            quiz_generator = QuizGenerator(vector_store)
+            ready_event.set()
+        logger.info("Reloaded existing vector store from %s", store_path)
+    except Exception as e:
+        logger.warning("Could not reload vector store (re-upload needed): %s", e)
+
+
+# Pydantic models for request validation
+class QuestionRequest(BaseModel):
+    question: str
+    k: int = 5
+
+
+class SummarizeRequest(BaseModel):
+    topic: Optional[str] = None
+    summary_type: str = "bullets"
+    k: int = 10
+
+
+class QuizRequest(BaseModel):
+    topic: str
+    num_questions: int = 10
+    difficulty: str = "medium"
+
+
+class GradeQuizRequest(BaseModel):
+    quiz_id: str
+    user_answers: Dict[int, str]
+
+
+# API Endpoints
+
+@app.get("/")
+def root():
+    """Health check and status endpoint"""
+    return {
+        "message": "AI Study Assistant API - Powered by Ollama",
+        "status": "running",
+        "documents_loaded": vector_store is not None,
+        "ollama_url": OLLAMA_URL,
+        "ollama_num_parallel": os.environ.get("OLLAMA_NUM_PARALLEL", "1 (default)"),
+        "endpoints": {
+            "upload": "/upload",
+            "ask": "/ask",
+            "summarize": "/summarize",
+            "definitions": "/definitions",
+            "quiz_generate": "/quiz/generate",
+            "quiz_grade": "/quiz/grade",
+            "documents": "/documents"
+        }
+    }
+
+
+@app.post("/upload")
+async def upload_document(file: UploadFile = File(...)):
+    """Upload and process a document (PDF or TXT)"""
+    global vector_store, rag_system, quiz_generator
+
+    async with state_lock:
+        return await _do_upload(file)
+
+
+async def _do_upload(file: UploadFile):
+    global vector_store, rag_system, quiz_generator
+
+    try:
+        logger.info("Upload request: filename=%s content_type=%s", file.filename, file.content_type)
+
+        # Validate file type and declared size before anything touches disk
+        file_extension = Path(file.filename).suffix.lower()
+        if file_extension not in ['.pdf', '.txt']:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type: {file_extension}. Only .pdf and .txt are supported."
+            )
+
+        declared_size = int(file.headers.get("content-length", 0) or 0)
+        if declared_size > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large: {declared_size} bytes. Limit is {MAX_UPLOAD_BYTES} bytes."
+            )
+
+        # Save uploaded file
+        file_path = os.path.join(UPLOAD_DIR, file.filename)
+        logger.info("Saving upload to %s", file_path)
+
+        # Stream to disk without blocking the event loop, enforcing the
+        # size cap as bytes actually arrive (headers can lie) and hashing
+        # the content in the same pass for the dedup manifest
+        bytes_written = 0
+        hasher = hashlib.blake2b()
+        try:
+            async with aiofiles.open(file_path, "wb") as buffer:
+                while chunk := await file.read(1 << 20):
+                    bytes_written += len(chunk)
+                    if bytes_written > MAX_UPLOAD_BYTES:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"File too large. Limit is {MAX_UPLOAD_BYTES} bytes."
+                        )
+                    hasher.update(chunk)
+                    await buffer.write(chunk)
+        except HTTPException:
+            # Don't leave a truncated file behind
+            if os.path.exists(file_path):
+                await asyncio.to_thread(os.remove, file_path)
+            raise
+
+        logger.info("File saved: %d bytes", bytes_written)
+
+        # Skip re-ingesting content we've already embedded
+        digest = hasher.hexdigest()
+        manifest = _load_manifest()
+        if digest in manifest:
+            entry = manifest[digest]
+            logger.info("Duplicate upload skipped: %s matches %s", file.filename, entry['filename'])
+            if entry['filename'] != file.filename:
+                await asyncio.to_thread(os.remove, file_path)
+            return {
+                "message": f"Document already indexed (uploaded as '{entry['filename']}')",
+                "filename": file.filename,
+                "chunks_created": entry['chunks'],
+                "status": "already_indexed"
+            }
+
+        # Process document
+        chunks = ingestion.process_documents(file_path)
+        
+        if not chunks:
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to extract content from document"
+            )
+        
+        # Create or update vector store
+        try:
+            if vector_store is None:
+                logger.info("Creating new vector store")
+                vector_store = ingestion.create_vector_store(chunks, VECTOR_STORE_NAME)
+            else:
+                logger.info("Updating existing vector store")
+                ingestion.add_documents_to_existing_store(chunks, VECTOR_STORE_NAME)
+                vector_store = ingestion.load_vector_store(VECTOR_STORE_NAME)
+        except Exception as e:
+            logger.error("Vector store error: %s", e)
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to create/update vector store: {str(e)}"
+            )
+        
+        # Initialize RAG and Quiz systems
+        rag_system = RAGSystem(vector_store)
+        quiz_generator = QuizGenerator(vector_store)
+
+        manifest[digest] = {"filename": file.filename, "chunks": len(chunks)}
+        _save_manifest(manifest)
+
+        _invalidate_cache()
+        ready_event.set()
+
+        logger.info("Upload complete: filename=%s chunks=%d", file.filename, len(chunks))
+
+        return {
+            "message": "Document uploaded and processed successfully",
+            "filename": file.filename,
+            "chunks_created": len(chunks),
+            "status": "success"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Upload failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+
+@app.post("/ask")
+async def ask_question(request: QuestionRequest, response: Response):
+    """Ask a question using RAG"""
+    await _require_ready()
+    rag = rag_system
+
+    try:
+        logger.info("Q&A request: %s", request.question)
+        response.headers["Cache-Control"] = "private, max-age=3600"
+
+        cache_key = ("ask", request.question.strip().lower(), request.k, vector_store_version)
+        if cache_key in _qa_cache:
+            logger.info("Q&A cache hit")
+            return _qa_cache[cache_key]
+
+        result = await llm_batcher.submit(rag.ask_question, request.question, request.k)
+        _qa_cache[cache_key] = result
+        logger.info("Q&A response: %d sources", len(result['sources']))
+        return result
+    except Exception as e:
+        logger.error("Q&A failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Question answering failed: {str(e)}")
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """Ask a question using RAG, streaming tokens as Server-Sent Events"""
+    await _require_ready()
+    rag = rag_system
+
+    logger.info("Q&A stream request: %s", request.question)
+
+    def event_source():
+        for chunk in rag.ask_question_stream(request.question, k=request.k):
+            yield f"data: {json.dumps(chunk)}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+
+@app.post("/summarize")
+async def summarize(request: SummarizeRequest, response: Response):
+    """Summarize content from uploaded documents"""
+    await _require_ready()
+    rag = rag_system
+
+    try:
+        logger.info("Summary request: type=%s topic=%s", request.summary_type, request.topic)
+        response.headers["Cache-Control"] = "private, max-age=3600"
+
+        topic = (request.topic or "").strip().lower()
+        cache_key = ("summarize", topic, request.summary_type, request.k, vector_store_version)
+        if cache_key in _qa_cache:
+            logger.info("Summary cache hit")
+            return _qa_cache[cache_key]
+
+        result = await llm_batcher.submit(
+            rag.summarize,
+            query=request.topic,
+            summary_type=request.summary_type,
+            k=request.k
+        )
+        _qa_cache[cache_key] = result
+        logger.info("Summary response: %d sources", len(result['sources']))
+        return result
+    except Exception as e:
+        logger.error("Summarization failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Summarization failed: {str(e)}")
+
+
+@app.post("/definitions")
+async def get_definitions(response: Response, topic: str = "definitions terms concepts"):
+    """Extract key definitions and terms from uploaded materials"""
+    await _require_ready()
+    rag = rag_system
+
+    try:
+        logger.info("Definitions request: topic=%s", topic)
+        response.headers["Cache-Control"] = "private, max-age=3600"
+
+        cache_key = ("definitions", topic.strip().lower(), vector_store_version)
+        if cache_key in _qa_cache:
+            logger.info("Definitions cache hit")
+            return _qa_cache[cache_key]
+
+        result = await llm_batcher.submit(rag.extract_definitions, query=topic)
+        _qa_cache[cache_key] = result
+        logger.info("Definitions response: %d sources", len(result['sources']))
+        return result
+    except Exception as e:
+        logger.error("Definition extraction failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Definition extraction failed: {str(e)}")
+
+
+@app.post("/quiz/generate")
+async def generate_quiz(request: QuizRequest):
+    """Generate a quiz from uploaded materials"""
+    await _require_ready()
+    quiz_gen = quiz_generator
+
+    try:
+        logger.info("Quiz request: topic=%s questions=%d difficulty=%s",
+                    request.topic, request.num_questions, request.difficulty)
+
+        quiz = await asyncio.to_thread(
+            quiz_gen.generate_quiz,
+            topic=request.topic,
+            num_questions=request.num_questions,
+            difficulty=request.difficulty
+        )
+        
+        if "error" in quiz:
+            raise HTTPException(status_code=500, detail=quiz["error"])
+
+        # Keep the quiz server-side; grading only needs the id back
+        quiz_id = uuid.uuid4().hex
+        _quiz_cache[quiz_id] = quiz
+        quiz["quiz_id"] = quiz_id
+
+        logger.info("Quiz response: %d questions quiz_id=%s", len(quiz.get('questions', [])), quiz_id)
+        return quiz
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Quiz generation failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Quiz generation failed: {str(e)}")
+
+
+@app.post("/quiz/grade")
+async def grade_quiz(request: GradeQuizRequest):
+    """Grade a quiz submission"""
+    await _require_ready()
+    quiz_gen = quiz_generator
+
+    quiz = _quiz_cache.get(request.quiz_id)
+    if quiz is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Quiz not found or expired. Please generate a new quiz."
+        )
+
+    try:
+        logger.info("Quiz grading: quiz_id=%s answers=%d", request.quiz_id, len(request.user_answers))
+        results = await asyncio.to_thread(quiz_gen.grade_quiz, quiz["questions"], request.user_answers)
+        logger.info("Quiz grading score: %s%%", results['score'])
+        return results
+    except Exception as e:
+        logger.error("Quiz grading failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Quiz grading failed: {str(e)}")
+
+
+@app.get("/documents")
+def list_documents():
+    """List all uploaded documents"""
+    try:
+        # scandir carries cached stat info, so is_file() costs no extra syscall
+        with os.scandir(UPLOAD_DIR) as entries:
+            files = [entry.name for entry in entries if entry.is_file()]
+        return {
+            "documents": files,
+            "count": len(files)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list documents: {str(e)}")
+
+
+@app.delete("/reset")
+async def reset_system():
+    """Reset the system (clear all data)"""
+    global vector_store, rag_system, quiz_generator
+
+    async with state_lock:
+        return await _do_reset()
+
+
+async def _do_reset():
+    global vector_store, rag_system, quiz_generator
+
+    try:
+        # Clear uploads (in a thread so the event loop keeps serving)
+        with os.scandir(UPLOAD_DIR) as entries:
+            upload_paths = [entry.path for entry in entries if entry.is_file()]
+        for file_path in upload_paths:
+            await asyncio.to_thread(os.remove, file_path)
+
+        # Clear vector store
+        vector_store_path = os.path.join(parent_dir, "data", "vector_store", VECTOR_STORE_NAME)
+        if os.path.exists(vector_store_path):
+            await asyncio.to_thread(shutil.rmtree, vector_store_path)
+
+        # Clear the dedup manifest
+        if os.path.exists(MANIFEST_PATH):
+            os.remove(MANIFEST_PATH)
+        
+        # Reset globals
+        vector_store = None
+        rag_system = None
+        quiz_generator = None
+
+        _invalidate_cache()
+        ready_event.clear()
+
+        return {
+            "message": "System reset successfully",
+            "status": "success"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reset failed: {str(e)}")
+
+
+# Run the API
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+
+    print("\n" + "="*60)
+    print("AI STUDY ASSISTANT API")
+    print("="*60)
+    print("Powered by: Ollama")
+    print("Tip: set OLLAMA_NUM_PARALLEL>1 so Ollama serves concurrent requests")
+    print("Starting server on: http://localhost:8000")
+    print("API Docs: http://localhost:8000/docs")
+    print("Event loop: uvloop + httptools (single worker: app state lives")
+    print("in process globals; run more workers only behind a shared store)")
+    print("="*60 + "\n")
+
+    # uvloop + httptools cut per-request event-loop and HTTP-parse overhead
+    # roughly in half vs. the default asyncio/h11 stack. Keep workers=1:
+    # vector_store/rag_system are module globals, so extra workers would
+    # each need their own upload before they could answer anything.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        log_level="info"
+    )
\ No newline at end of file
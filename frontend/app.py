@@ -7,6 +7,11 @@ import time
 # API Configuration
 API_URL = "http://localhost:8000"
 
+# Shared session so every call reuses the same TCP connection (keep-alive)
+# instead of paying a fresh handshake on each Streamlit rerun
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
 # Page config
 st.set_page_config(
     page_title="AI Study Assistant",
@@ -60,34 +65,54 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_data(ttl=5)
 def check_api_status():
-    """Check if API is running"""
+    """Check if API is running (cached so reruns don't re-poll)"""
     try:
-        response = requests.get(f"{API_URL}/", timeout=2)
+        response = SESSION.get(f"{API_URL}/", timeout=2)
         return response.json()
     except:
         return None
 
 
+@st.cache_data(ttl=10)
+def get_documents():
+    """List uploaded documents (cached so reruns don't re-poll)"""
+    response = SESSION.get(f"{API_URL}/documents")
+    return response.json()
+
+
 def upload_document(file):
     """Upload document to API"""
     files = {"file": (file.name, file, file.type)}
-    response = requests.post(f"{API_URL}/upload", files=files)
+    response = SESSION.post(f"{API_URL}/upload", files=files)
     return response.json()
 
 
 def ask_question(question: str, k: int = 5):
     """Ask a question"""
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/ask",
         json={"question": question, "k": k}
     )
     return response.json()
 
 
+def ask_question_stream(question: str, k: int = 5):
+    """Ask a question, yielding SSE events as the answer streams in"""
+    response = SESSION.post(
+        f"{API_URL}/ask/stream",
+        json={"question": question, "k": k},
+        stream=True
+    )
+    for line in response.iter_lines():
+        if line and line.startswith(b"data: "):
+            yield json.loads(line[len(b"data: "):])
+
+
 def get_summary(topic: str = None, summary_type: str = "bullets", k: int = 10):
     """Get summary"""
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/summarize",
         json={"topic": topic, "summary_type": summary_type, "k": k}
     )
@@ -96,7 +121,7 @@ def get_summary(topic: str = None, summary_type: str = "bullets", k: int = 10):
 
 def get_definitions(topic: str = "definitions"):
     """Get definitions"""
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/definitions",
         params={"topic": topic}
     )
@@ -105,7 +130,7 @@ def get_definitions(topic: str = "definitions"):
 
 def generate_quiz(topic: str, num_questions: int, difficulty: str):
     """Generate quiz"""
-    response = requests.post(
+    response = SESSION.post(
         f"{API_URL}/quiz/generate",
         json={
             "topic": topic,
@@ -116,12 +141,12 @@ def generate_quiz(topic: str, num_questions: int, difficulty: str):
     return response.json()
 
 
-def grade_quiz(questions: List[Dict], user_answers: Dict[int, str]):
-    """Grade quiz"""
-    response = requests.post(
+def grade_quiz(quiz_id: str, user_answers: Dict[int, str]):
+    """Grade quiz by id (questions stay server-side)"""
+    response = SESSION.post(
         f"{API_URL}/quiz/grade",
         json={
-            "questions": questions,
+            "quiz_id": quiz_id,
             "user_answers": user_answers
         }
     )
@@ -169,6 +194,8 @@ def main():
                         result = upload_document(uploaded_file)
                         st.success(f"✅ {result['message']}")
                         st.info(f"📊 Created {result['chunks_created']} chunks")
+                        check_api_status.clear()
+                        get_documents.clear()
                         time.sleep(1)
                         st.rerun()
                     except Exception as e:
@@ -178,9 +205,8 @@ def main():
         
         # Display uploaded documents
         try:
-            docs_response = requests.get(f"{API_URL}/documents")
-            docs_data = docs_response.json()
-            
+            docs_data = get_documents()
+
             if docs_data['documents']:
                 st.subheader(f"📚 Uploaded Files ({docs_data['count']})")
                 for doc in docs_data['documents']:
@@ -194,8 +220,10 @@ def main():
         if st.button("🔄 Reset System", use_container_width=True, type="secondary"):
             if st.confirm("⚠️ This will delete all data. Continue?"):
                 try:
-                    requests.delete(f"{API_URL}/reset")
+                    SESSION.delete(f"{API_URL}/reset")
                     st.success("System reset!")
+                    check_api_status.clear()
+                    get_documents.clear()
                     time.sleep(1)
                     st.rerun()
                 except:
@@ -222,22 +250,31 @@ def main():
         
         if st.button("🔍 Get Answer", use_container_width=True, type="primary"):
             if question:
-                with st.spinner("Searching knowledge base and generating answer..."):
-                    try:
-                        result = ask_question(question, k=k_value)
-                        
-                        st.markdown("### 💡 Answer")
-                        st.markdown(result['answer'])
-                        
-                        if result['sources']:
-                            with st.expander(f"📖 View {len(result['sources'])} Sources"):
-                                for i, source in enumerate(result['sources'], 1):
-                                    st.markdown(f"**Source {i}: {source['source']} (Page {source['page']})**")
-                                    st.text(source['excerpt'])
-                                    if i < len(result['sources']):
-                                        st.divider()
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
+                try:
+                    st.markdown("### 💡 Answer")
+
+                    # Render tokens as they arrive; the final event carries sources
+                    final_event = {}
+
+                    def iter_tokens():
+                        for event in ask_question_stream(question, k=k_value):
+                            if event.get('done'):
+                                final_event.update(event)
+                            elif 'token' in event:
+                                yield event['token']
+
+                    st.write_stream(iter_tokens)
+
+                    sources = final_event.get('sources', [])
+                    if sources:
+                        with st.expander(f"📖 View {len(sources)} Sources"):
+                            for i, source in enumerate(sources, 1):
+                                st.markdown(f"**Source {i}: {source['source']} (Page {source['page']})**")
+                                st.text(source['excerpt'])
+                                if i < len(sources):
+                                    st.divider()
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
             else:
                 st.warning("⚠️ Please enter a question")
         
@@ -377,7 +414,7 @@ def main():
             if st.button("✅ Submit Quiz", use_container_width=True, type="primary"):
                 with st.spinner("Grading your quiz..."):
                     try:
-                        results = grade_quiz(quiz_data['questions'], user_answers)
+                        results = grade_quiz(quiz_data['quiz_id'], user_answers)
                         
                         # Show score
                         score = results['score']
@@ -1,28 +1,371 @@
+import functools
+import hashlib
+import io
+import itertools
 import os
-from typing import List, Dict
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Optional
 from pathlib import Path
+import httpx
+import numpy
 import pypdf
+
+try:
+    # C-backed PDFium parser; 10-50x faster than pypdf's pure-Python
+    # text extraction on real PDFs
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    # Rust-backed splitter; chunks large texts far faster than the
+    # recursive pure-Python splitter and respects sentence boundaries
+    from semantic_text_splitter import TextSplitter as SemanticTextSplitter
+except ImportError:
+    SemanticTextSplitter = None
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
+from tqdm import tqdm
+from src.ollama_client import SHARED_HTTP_CLIENT
 import json
+import orjson
+
+EMBED_BATCH_SIZE = 64
+
+# Below this page count, worker-process startup costs more than it saves
+SMALL_PDF_PAGES = 20
+
+# Compiled once; clean_text runs on every extracted page
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# PDFs up to this size are read into memory in one shot for pypdf
+_IN_MEMORY_PDF_BYTES = 32 * 1024 * 1024
+
+
+def _open_pdf_buffered(pdf_path: str):
+    """Open a PDF for pypdf without seek-thrashing the disk
+
+    pypdf resolves cross-reference tables with many small seeks and
+    reads; the default 8 KiB buffer turns that into a syscall per hop.
+    Small files are loaded fully into a BytesIO, larger ones get a 1 MiB
+    read buffer.
+    """
+    if os.path.getsize(pdf_path) <= _IN_MEMORY_PDF_BYTES:
+        return io.BytesIO(Path(pdf_path).read_bytes())
+    return open(pdf_path, 'rb', buffering=1024 * 1024)
+
+
+def _count_pdf_pages(pdf_path: str, backend: str) -> int:
+    """Open the PDF just long enough to read the page count"""
+    if backend == "pypdfium2" and pypdfium2 is not None:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with _open_pdf_buffered(pdf_path) as file:
+        return len(pypdf.PdfReader(file, strict=False).pages)
+
+
+def _page_has_text(page) -> bool:
+    """Cheap check for any text on a pypdf page
+
+    Scanned or diagram-only pages have no BT (begin-text) operator in
+    their content stream; skipping extract_text() for them avoids
+    pypdf's full operator-by-operator parse. Any doubt (no stream,
+    decode failure) counts as "has text" so extraction still runs.
+    """
+    try:
+        contents = page.get_contents()
+        if contents is None:
+            return False
+        return b"BT" in contents.get_data()
+    except Exception:
+        return True
+
+
+def _extract_one_page(pdf_path: str, page_index: int, backend: str = "pypdfium2") -> str:
+    """Extract text from a single page (runs in a worker process)
+
+    Each worker reopens the file, which is cheap once the OS page cache
+    is warm from the initial page count.
+    """
+    try:
+        if backend == "pypdfium2" and pypdfium2 is not None:
+            pdf = pypdfium2.PdfDocument(pdf_path)
+            try:
+                textpage = pdf[page_index].get_textpage()
+                try:
+                    return textpage.get_text_range()
+                finally:
+                    textpage.close()
+            finally:
+                pdf.close()
+
+        with _open_pdf_buffered(pdf_path) as file:
+            # strict=False skips pypdf's recoverable-damage warnings and
+            # repair passes; plain extraction avoids the layout
+            # reconstruction work, and chunking discards layout anyway
+            reader = pypdf.PdfReader(file, strict=False)
+            page = reader.pages[page_index]
+            if not _page_has_text(page):
+                return ""
+            return page.extract_text(extraction_mode="plain")
+    except Exception as e:
+        print(f"✗ Error extracting page {page_index + 1} of {pdf_path}: {str(e)}")
+        return ""
+
+# Embed requests are short; don't inherit the shared client's generous
+# generation timeout
+_EMBED_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+
+class BatchedOllamaEmbeddings(OllamaEmbeddings):
+    """OllamaEmbeddings that sends texts in batches through /api/embed
+
+    LangChain's OllamaEmbeddings loops one HTTP round-trip per chunk
+    against the deprecated /api/embeddings endpoint. /api/embed accepts a
+    list input, so a whole batch of chunks costs a single request on a
+    persistent connection.
+    """
+
+    batch_size: int = EMBED_BATCH_SIZE
+    max_concurrent: int = 4
+    # Extra Ollama hosts to spread embed batches over; when unset all
+    # batches go to base_url
+    base_urls: Optional[List[str]] = None
+    # Character budget per batch: chunks vary a lot in length, so a
+    # fixed count can produce one batch 10x heavier than the next
+    max_batch_chars: int = 150_000
+
+    def _pack_batches(self, texts: List[str]) -> List[List[str]]:
+        """Greedily pack texts into batches under both the count cap
+        and the character budget, preserving order"""
+        batches = []
+        current, chars = [], 0
+        for text in texts:
+            if current and (len(current) >= self.batch_size
+                            or chars + len(text) > self.max_batch_chars):
+                batches.append(current)
+                current, chars = [], 0
+            current.append(text)
+            chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: List[str], base_url: Optional[str] = None) -> Dict:
+        response = SHARED_HTTP_CLIENT.post(
+            f"{base_url or self.base_url}/api/embed",
+            json={"model": self.model, "input": batch},
+            timeout=_EMBED_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _embed_with_retry(self, batch: List[str], base_url: Optional[str] = None):
+        """Embed one batch, halving and retrying on timeout or 5xx
+
+        Returns the vectors, or None if the server lacks /api/embed
+        (signalling the legacy fallback).
+        """
+        try:
+            payload = self._embed_batch(batch, base_url)
+        except (httpx.TimeoutException, httpx.HTTPStatusError) as e:
+            if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                raise
+            if len(batch) == 1:
+                print(f"✗ Embedding failed for a single chunk: {e}")
+                raise
+            # An overloaded server usually survives the same texts in
+            # two smaller requests
+            print(f"  Embed batch of {len(batch)} failed ({type(e).__name__}), retrying in halves...")
+            mid = len(batch) // 2
+            left = self._embed_with_retry(batch[:mid], base_url)
+            right = self._embed_with_retry(batch[mid:], base_url)
+            if left is None or right is None:
+                return None
+            return left + right
+
+        if "embeddings" not in payload:
+            return None
+        return payload["embeddings"]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = self._pack_batches(texts)
+
+        # Round-robin batches over the configured hosts so several
+        # Ollama instances embed in parallel
+        hosts = itertools.cycle(self.base_urls or [self.base_url])
+        urls = [next(hosts) for _ in batches]
+
+        # The work is I/O-bound on HTTP, so a few batches in flight at
+        # once overlap nicely; pool.map keeps results in batch order
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_concurrent) as pool:
+                results = list(pool.map(self._embed_with_retry, batches, urls))
+        else:
+            results = [self._embed_with_retry(batch, url) for batch, url in zip(batches, urls)]
+
+        embeddings = []
+        for vectors in results:
+            if vectors is None:
+                # Older Ollama without /api/embed - fall back to the
+                # sequential LangChain implementation
+                return super().embed_documents(texts)
+            embeddings.extend(vectors)
+        return embeddings
+
+
+def _quantize_int8(vector: List[float]) -> tuple:
+    """Quantize a float vector to (int8 bytes, scale)
+
+    Symmetric quantization: scale = 127 / max|v|, so dequantized values
+    land within ~0.8% of the original, which leaves cosine rankings
+    effectively unchanged while storing 1 byte per dimension.
+    """
+    arr = numpy.asarray(vector, dtype=numpy.float32)
+    peak = float(numpy.max(numpy.abs(arr))) if arr.size else 0.0
+    scale = 127.0 / peak if peak else 1.0
+    quantized = numpy.round(arr * scale).astype(numpy.int8)
+    return quantized.tobytes(), scale
+
+
+def _dequantize_int8(blob: bytes, scale: float) -> List[float]:
+    """Recover a float vector from int8 bytes and its scale"""
+    arr = numpy.frombuffer(blob, dtype=numpy.int8).astype(numpy.float32)
+    return (arr / scale).tolist()
+
+
+class EmbeddingCache:
+    """Sidecar SQLite cache of chunk embeddings keyed by (model, text hash)
+
+    Embedding dominates ingestion cost, and re-uploads or overlapping
+    documents repeat many chunks verbatim, so cache hits skip the model
+    entirely. With quantize=True new vectors are stored int8 (1 byte per
+    dimension plus a scale) instead of JSON floats, shrinking the cache
+    roughly 20x; either format is read back transparently.
+    """
+
+    def __init__(self, cache_path: str, quantize: bool = False):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self.quantize = quantize
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "  model TEXT NOT NULL,"
+            "  sha1 TEXT NOT NULL,"
+            "  vector TEXT NOT NULL,"
+            "  PRIMARY KEY (model, sha1)"
+            ")"
+        )
+        try:
+            # Present when any quantized entries exist; NULL rows are
+            # plain JSON vectors
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN scale REAL")
+        except sqlite3.OperationalError:
+            pass  # column already there
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Return {hash: vector} for every hash already cached"""
+        found = {}
+        # SQLite caps bound parameters, so query in slices
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT sha1, vector, scale FROM embeddings WHERE model = ? AND sha1 IN ({placeholders})",
+                [model] + batch
+            )
+            for sha1, vector, scale in rows:
+                if scale is not None:
+                    found[sha1] = _dequantize_int8(vector, scale)
+                else:
+                    found[sha1] = json.loads(vector)
+        return found
+
+    def put_many(self, model: str, items: List[tuple]):
+        """Store [(hash, vector), ...] entries"""
+        if self.quantize:
+            rows = []
+            for sha1, vector in items:
+                blob, scale = _quantize_int8(vector)
+                rows.append((model, sha1, blob, scale))
+        else:
+            rows = [(model, sha1, json.dumps(vector), None) for sha1, vector in items]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, sha1, vector, scale) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        self._conn.commit()
 
 
 class DocumentIngestion:
     """Handles document upload, processing, and indexing with Ollama"""
-    
-    def __init__(self, vector_store_path: str = "data/vector_store"):
+
+    def __init__(self, vector_store_path: str = "data/vector_store",
+                 embed_batch_size: int = EMBED_BATCH_SIZE, embed_concurrency: int = 4,
+                 pdf_backend: str = "pypdfium2", base_urls: Optional[List[str]] = None,
+                 chroma_server_url: Optional[str] = None, quantize_cache: bool = False):
         self.vector_store_path = vector_store_path
-        
+
+        # Optional standalone Chroma server (e.g. "http://localhost:8001"):
+        # queries then run in a separate process instead of inside the
+        # API worker. Default stays the embedded on-disk store.
+        self.chroma_server_url = chroma_server_url
+        self._chroma_client = None
+        if chroma_server_url:
+            import chromadb
+            from urllib.parse import urlparse
+            parsed = urlparse(chroma_server_url)
+            self._chroma_client = chromadb.HttpClient(
+                host=parsed.hostname or "localhost",
+                port=parsed.port or 8000
+            )
+            print(f"Using Chroma server at {chroma_server_url}")
+
+        # PDF text extraction backend: "pypdfium2" (C, fast) or "pypdf"
+        # (pure Python); fall back to pypdf if pypdfium2 isn't installed
+        if pdf_backend == "pypdfium2" and pypdfium2 is None:
+            pdf_backend = "pypdf"
+        self.pdf_backend = pdf_backend
+
+        # Loaded Chroma handles by store name; reopening a store costs a
+        # fresh SQLite connection and collection lookup every time
+        self._stores: Dict[str, Chroma] = {}
+
+        # Chunk-level embedding cache shared across all stores
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(vector_store_path, "embeddings_cache.sqlite"),
+            quantize=quantize_cache
+        )
+
         # Initialize Ollama embeddings
         print("Initializing Ollama embeddings...")
-        self.embeddings = OllamaEmbeddings(
+        self.embeddings = BatchedOllamaEmbeddings(
             model="nomic-embed-text",
-            base_url="http://localhost:11434"
+            base_url="http://localhost:11434",
+            batch_size=embed_batch_size,
+            max_concurrent=embed_concurrency,
+            base_urls=base_urls
         )
         
-        # Text splitter configuration
+        # Text splitter configuration: same 1000/200 chunking either
+        # way, Rust-backed when semantic_text_splitter is installed
+        self.semantic_splitter = None
+        if SemanticTextSplitter is not None:
+            try:
+                self.semantic_splitter = SemanticTextSplitter(1000, overlap=200)
+            except TypeError:
+                # Older releases have no overlap support; the quality
+                # loss outweighs the speed win, keep the fallback
+                self.semantic_splitter = None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
@@ -30,36 +373,66 @@ class DocumentIngestion:
             separators=["\n\n", "\n", ".", " ", ""]
         )
     
+    def _make_chroma(self, store_name: str, store_path: str, **kwargs) -> Chroma:
+        """Build a Chroma store against the server if configured,
+        otherwise against the embedded on-disk directory"""
+        if self._chroma_client is not None:
+            return Chroma(
+                client=self._chroma_client,
+                embedding_function=self.embeddings,
+                collection_name=store_name,
+                **kwargs
+            )
+        return Chroma(
+            persist_directory=store_path,
+            embedding_function=self.embeddings,
+            collection_name=store_name,
+            **kwargs
+        )
+
     def extract_text_from_pdf(self, pdf_path: str) -> List[Dict]:
-        """Extract text from PDF with page numbers"""
+        """Extract text from PDF with page numbers, one worker per page
+
+        Page extraction is CPU-bound and independent per page, so large
+        PDFs fan out across a ProcessPoolExecutor. Small PDFs are
+        extracted in-process: worker startup would dominate, and PDFium
+        is not thread-safe so threads are no shortcut.
+        """
         documents = []
-        
+
         try:
-            print(f"Extracting text from {pdf_path}...")
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = pypdf.PdfReader(file)
-                filename = Path(pdf_path).name
-                total_pages = len(pdf_reader.pages)
-                
-                for page_num, page in enumerate(pdf_reader.pages, start=1):
-                    print(f"  Processing page {page_num}/{total_pages}...", end='\r')
-                    text = page.extract_text()
-                    
-                    if text.strip():
-                        documents.append({
-                            'content': text,
-                            'metadata': {
-                                'source': filename,
-                                'page': page_num,
-                                'type': 'pdf'
-                            }
-                        })
-                
-                print(f"\n✓ Extracted {len(documents)} pages from {filename}")
-                        
+            print(f"Extracting text from {pdf_path} ({self.pdf_backend})...")
+            filename = Path(pdf_path).name
+            total_pages = _count_pdf_pages(pdf_path, self.pdf_backend)
+
+            worker = functools.partial(_extract_one_page, pdf_path, backend=self.pdf_backend)
+
+            if total_pages < SMALL_PDF_PAGES:
+                page_texts = [worker(index)
+                              for index in tqdm(range(total_pages), desc="Extracting pages", unit="page")]
+            else:
+                max_workers = min(os.cpu_count() or 1, total_pages)
+                print(f"  Extracting {total_pages} pages across {max_workers} workers...")
+                with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                    page_texts = list(tqdm(pool.map(worker, range(total_pages)),
+                                           total=total_pages, desc="Extracting pages", unit="page"))
+
+            for page_num, text in enumerate(page_texts, start=1):
+                if text.strip():
+                    documents.append({
+                        'content': text,
+                        'metadata': {
+                            'source': filename,
+                            'page': page_num,
+                            'type': 'pdf'
+                        }
+                    })
+
+            print(f"✓ Extracted {len(documents)} pages from {filename}")
+
         except Exception as e:
             print(f"✗ Error extracting PDF {pdf_path}: {str(e)}")
-            
+
         return documents
     
     def extract_text_from_txt(self, txt_path: str) -> List[Dict]:
@@ -84,13 +457,25 @@ class DocumentIngestion:
     
     def clean_text(self, text: str) -> str:
         """Clean extracted text"""
-        # Remove excessive whitespace
-        text = ' '.join(text.split())
-        # Remove null characters
-        text = text.replace('\x00', '')
-        # Remove very short lines that are likely artifacts
+        # Collapse whitespace in one regex pass instead of allocating a
+        # word list via split/join
+        text = _WHITESPACE_RE.sub(' ', text)
+        # Remove null characters (skip the pass when there are none)
+        if '\x00' in text:
+            text = text.replace('\x00', '')
         return text.strip()
     
+    def _split_documents(self, documents: List[Document]) -> List[Document]:
+        """Split documents into chunks with whichever splitter is available"""
+        if self.semantic_splitter is None:
+            return self.text_splitter.split_documents(documents)
+
+        chunks = []
+        for doc in tqdm(documents, desc="Chunking", unit="doc"):
+            for text in self.semantic_splitter.chunks(doc.page_content):
+                chunks.append(Document(page_content=text, metadata=dict(doc.metadata)))
+        return chunks
+
     def process_documents(self, file_path: str) -> List[Document]:
         """Process a document into chunks"""
         print(f"\n{'='*50}")
@@ -125,8 +510,8 @@ class DocumentIngestion:
         
         # Split into chunks
         print("Splitting into chunks...")
-        chunks = self.text_splitter.split_documents(documents)
-        
+        chunks = self._split_documents(documents)
+
         print(f"✓ Created {len(chunks)} chunks")
         print(f"{'='*50}\n")
         
@@ -144,15 +529,43 @@ class DocumentIngestion:
         store_path = os.path.join(self.vector_store_path, store_name)
         os.makedirs(store_path, exist_ok=True)
         
-        print(f"Generating embeddings for {len(documents)} chunks...")
-        print("This may take a few minutes...")
-        
-        # Create vector store with Ollama embeddings
-        vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            persist_directory=store_path,
-            collection_name=store_name
+        texts = [doc.page_content for doc in documents]
+        hashes = [hashlib.sha1(text.encode()).hexdigest() for text in texts]
+
+        # Only embed chunks we haven't seen before; everything else comes
+        # from the sidecar cache
+        cached = self.embedding_cache.get_many(self.embeddings.model, hashes)
+        uncached = [(index, text) for index, (text, sha1) in enumerate(zip(texts, hashes))
+                    if sha1 not in cached]
+
+        print(f"Generating embeddings for {len(uncached)} chunks "
+              f"({len(texts) - len(uncached)} cached)...")
+        if uncached:
+            print("This may take a few minutes...")
+
+        vectors = [cached.get(sha1) for sha1 in hashes]
+        if uncached:
+            new_vectors = self.embeddings.embed_documents([text for _, text in uncached])
+            for (index, _), vector in zip(uncached, new_vectors):
+                vectors[index] = vector
+            self.embedding_cache.put_many(
+                self.embeddings.model,
+                [(hashes[index], vector) for (index, _), vector in zip(uncached, new_vectors)]
+            )
+
+        # Create the store empty, then insert with the precomputed vectors
+        # so Chroma doesn't re-embed anything. Cosine space keeps HNSW
+        # distance computations on normalized embeddings cheap
+        # (nomic-embed-text vectors are meant for cosine similarity).
+        vector_store = self._make_chroma(
+            store_name, store_path,
+            collection_metadata={"hnsw:space": "cosine"}
+        )
+        vector_store._collection.add(
+            ids=[f"{sha1}-{index}" for index, sha1 in enumerate(hashes)],
+            embeddings=vectors,
+            documents=texts,
+            metadatas=[doc.metadata for doc in documents]
         )
         
         # Save metadata
@@ -162,31 +575,36 @@ class DocumentIngestion:
             'store_name': store_name
         }
         
-        with open(os.path.join(store_path, 'metadata.json'), 'w') as f:
-            json.dump(metadata, f, indent=2)
+        Path(store_path, 'metadata.json').write_bytes(
+            orjson.dumps(metadata, option=orjson.OPT_INDENT_2)
+        )
         
         print(f"✓ Vector store created at: {store_path}")
         print(f"✓ Indexed {len(documents)} document chunks")
         print(f"{'='*50}\n")
-        
+
+        self._stores[store_name] = vector_store
         return vector_store
     
     def load_vector_store(self, store_name: str = "default"):
-        """Load existing vector store"""
+        """Load existing vector store (cached after the first load)"""
+        if store_name in self._stores:
+            return self._stores[store_name]
+
         store_path = os.path.join(self.vector_store_path, store_name)
-        
-        if not os.path.exists(store_path):
+
+        # The on-disk check only applies to the embedded store; the
+        # server owns its own storage
+        if self._chroma_client is None and not os.path.exists(store_path):
             raise FileNotFoundError(f"Vector store not found at {store_path}")
-        
-        print(f"Loading vector store from {store_path}...")
-        
-        vector_store = Chroma(
-            persist_directory=store_path,
-            embedding_function=self.embeddings,
-            collection_name=store_name
-        )
-        
+
+        print(f"Loading vector store from "
+              f"{self.chroma_server_url or store_path}...")
+
+        vector_store = self._make_chroma(store_name, store_path)
+
         print(f"✓ Vector store loaded")
+        self._stores[store_name] = vector_store
         return vector_store
     
     def add_documents_to_existing_store(self, documents: List[Document], store_name: str = "default"):
@@ -197,7 +615,11 @@ class DocumentIngestion:
             
             print(f"Adding {len(documents)} new documents...")
             vector_store.add_documents(documents)
-            
+
+            # Drop the cached handle: callers should reopen and see the
+            # collection with the new documents
+            self._stores.pop(store_name, None)
+
             print("✓ Documents added successfully")
         except FileNotFoundError:
             print("No existing store found. Creating new one...")
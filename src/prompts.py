@@ -15,6 +15,25 @@ Question: {question}
 
 Answer:"""
 
+BATCH_QA_PROMPT_TEMPLATE = """You are a helpful tutoring assistant. Answer each numbered question below using ONLY its own context.
+
+Rules:
+1. If an answer is in its context, provide a clear explanation
+2. If an answer is NOT in its context, say "I don't have enough information from your materials to answer this."
+3. Keep answers concise but complete
+4. Never use one question's context to answer another
+
+{sections}
+
+IMPORTANT: Return ONLY valid JSON with no extra text. Use this exact format:
+
+[
+  {{"n": 1, "answer": "answer to question 1"}},
+  {{"n": 2, "answer": "answer to question 2"}}
+]
+
+JSON:"""
+
 SUMMARIZATION_PROMPT_TEMPLATE = """Summarize the following study material content.
 
 Content:
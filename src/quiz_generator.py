@@ -1,10 +1,14 @@
-import json
 import re
 from typing import List, Dict
-from langchain_community.llms import Ollama
+import orjson
 from langchain_community.vectorstores import Chroma
+from src.ollama_client import OllamaLLM
 from src.prompts import QUIZ_GENERATION_PROMPT
 
+# Compiled once at import; re.DOTALL patterns are re-verified on every
+# re.search call otherwise
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 
 class QuizGenerator:
     """Generate quizzes from study materials using Ollama"""
@@ -14,10 +18,11 @@ class QuizGenerator:
         
         print(f"Initializing Quiz Generator with {model_name}")
         
-        self.llm = Ollama(
+        # Same direct client as the RAG system, so quiz generation
+        # shares the process-wide connection pool and keep_alive
+        self.llm = OllamaLLM(
             model=model_name,
             temperature=0.7,  # Slightly higher for creative question generation
-            base_url="http://localhost:11434",
             num_predict=2048,  # Allow longer responses for multiple questions
         )
         
@@ -80,8 +85,8 @@ class QuizGenerator:
             # Clean up response - extract JSON
             quiz_text = self._extract_json(quiz_text)
             
-            # Parse JSON
-            quiz_data = json.loads(quiz_text)
+            # Parse JSON (orjson parses in native code)
+            quiz_data = orjson.loads(quiz_text)
             
             # Validate structure
             if "questions" not in quiz_data or not isinstance(quiz_data["questions"], list):
@@ -98,7 +103,7 @@ class QuizGenerator:
             print(f"✓ Successfully generated {len(quiz_data['questions'])} questions")
             return quiz_data
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             print(f"✗ JSON parsing failed: {str(e)}")
             return {
                 "error": f"Failed to parse quiz JSON: {str(e)}",
@@ -114,6 +119,13 @@ class QuizGenerator:
     
     def _extract_json(self, text: str) -> str:
         """Extract JSON from model response"""
+        text = text.strip()
+
+        # Fast path: response is already a bare JSON object (the common
+        # case when the model follows the prompt), no regex needed
+        if text.startswith("{") and text.endswith("}"):
+            return text
+
         # Remove markdown code blocks
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0]
@@ -126,7 +138,7 @@ class QuizGenerator:
                     break
         
         # Find JSON object
-        match = re.search(r'\{.*\}', text, re.DOTALL)
+        match = _JSON_RE.search(text)
         if match:
             text = match.group(0)
         
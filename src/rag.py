@@ -1,172 +1,302 @@
-from typing import List, Dict, Optional
-from langchain_community.llms import Ollama
-from langchain_community.vectorstores import Chroma
-from src.prompts import (
-    QA_PROMPT_TEMPLATE, 
-    SUMMARIZATION_PROMPT_TEMPLATE, 
-    DEFINITION_EXTRACTION_PROMPT
-)
-
-
-class RAGSystem:
-    """RAG-based Q&A system using Ollama"""
-    
-    def __init__(self, vector_store: Chroma, model_name: str = "llama3.2", temperature: float = 0.3):
-        self.vector_store = vector_store
-        
-        print(f"Initializing RAG with Ollama model: {model_name}")
-        
-        # Initialize Ollama LLM
-        self.llm = Ollama(
-            model=model_name,
-            temperature=temperature,
-            base_url="http://localhost:11434",
-            num_predict=512,  # Max tokens to generate
-        )
-        
-        # Setup retriever
-        self.retriever = vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5}
-        )
-        
-        print("✓ RAG System ready")
-    
-    def ask_question(self, question: str, k: int = 5) -> Dict:
-        """Answer a question using RAG"""
-        print(f"\n{'='*50}")
-        print(f"Question: {question}")
-        print(f"{'='*50}")
-        
-        # Retrieve relevant documents
-        print("Searching for relevant content...")
-        relevant_docs = self.vector_store.similarity_search(question, k=k)
-        
-        if not relevant_docs:
-            return {
-                "answer": "I couldn't find relevant information in your study materials.",
-                "sources": []
-            }
-        
-        print(f"✓ Found {len(relevant_docs)} relevant chunks")
-        
-        # Prepare context
-        context = "\n\n".join([
-            f"[Source: {doc.metadata.get('source', 'unknown')}, Page: {doc.metadata.get('page', 'N/A')}]\n{doc.page_content}"
-            for doc in relevant_docs
-        ])
-        
-        # Create prompt
-        prompt = QA_PROMPT_TEMPLATE.format(context=context, question=question)
-        
-        # Get answer from Ollama
-        print("Generating answer...")
-        answer = self.llm.invoke(prompt)
-        
-        print("✓ Answer generated")
-        
-        # Prepare sources
-        sources = [
-            {
-                "source": doc.metadata.get('source', 'unknown'),
-                "page": doc.metadata.get('page', 'N/A'),
-                "excerpt": doc.page_content[:200] + "..."
-            }
-            for doc in relevant_docs
-        ]
-        
-        return {
-            "answer": answer,
-            "sources": sources
-        }
-    
-    def summarize(self, query: str = None, summary_type: str = "bullets", k: int = 10) -> Dict:
-        """Summarize content from the knowledge base"""
-        print(f"\n{'='*50}")
-        print(f"Summarization Request: {summary_type}")
-        print(f"{'='*50}")
-        
-        if query:
-            print(f"Topic: {query}")
-            relevant_docs = self.vector_store.similarity_search(query, k=k)
-        else:
-            print("Generating general summary")
-            # Get diverse chunks for general summary
-            relevant_docs = self.vector_store.similarity_search("overview main concepts key topics", k=k)
-        
-        if not relevant_docs:
-            return {
-                "summary": "No content found to summarize.",
-                "sources": []
-            }
-        
-        print(f"✓ Found {len(relevant_docs)} relevant chunks")
-        
-        # Prepare context
-        context = "\n\n".join([doc.page_content for doc in relevant_docs])
-        
-        # Create prompt
-        prompt = SUMMARIZATION_PROMPT_TEMPLATE.format(
-            context=context[:4000],  # Limit context size
-            summary_type=summary_type
-        )
-        
-        # Generate summary
-        print("Generating summary...")
-        summary = self.llm.invoke(prompt)
-        
-        print("✓ Summary generated")
-        
-        # Prepare sources
-        sources = list(set([doc.metadata.get('source', 'unknown') for doc in relevant_docs]))
-        
-        return {
-            "summary": summary,
-            "sources": sources
-        }
-    
-    def extract_definitions(self, query: str = "definitions terms concepts", k: int = 10) -> Dict:
-        """Extract key definitions from content"""
-        print(f"\n{'='*50}")
-        print("Extracting Definitions")
-        print(f"{'='*50}")
-        
-        relevant_docs = self.vector_store.similarity_search(query, k=k)
-        
-        if not relevant_docs:
-            return {
-                "definitions": "No definitions found.",
-                "sources": []
-            }
-        
-        print(f"✓ Found {len(relevant_docs)} relevant chunks")
-        
-        context = "\n\n".join([doc.page_content for doc in relevant_docs])
-        prompt = DEFINITION_EXTRACTION_PROMPT.format(context=context[:4000])
-        
-        print("Extracting definitions...")
-        definitions = self.llm.invoke(prompt)
-        
-        print("✓ Definitions extracted")
-        
-        sources = list(set([doc.metadata.get('source', 'unknown') for doc in relevant_docs]))
-        
-        return {
-            "definitions": definitions,
-            "sources": sources
-        }
-
-
-# Test the module
-if __name__ == "__main__":
-    print("RAG System Module - Ready!")
-    print("\nTo test:")
-    print("1. First create a vector store using ingestion.py")
-    print("2. Then run:")
-    print("\n  from src.ingestion import DocumentIngestion")
-    print("  from src.rag import RAGSystem")
-    print("  ingestion = DocumentIngestion()")
-    print("  vector_store = ingestion.load_vector_store('test_store')")
-    print("  rag = RAGSystem(vector_store)")
-    print("  result = rag.ask_question('What is machine learning?')")
+import json
+import re
+from typing import List, Dict, Optional
+from langchain_community.vectorstores import Chroma
+from src.ollama_client import OllamaLLM
+from src.prompts import (
+    QA_PROMPT_TEMPLATE,
+    BATCH_QA_PROMPT_TEMPLATE,
+    SUMMARIZATION_PROMPT_TEMPLATE,
+    DEFINITION_EXTRACTION_PROMPT
+)
+
+# More questions than this per prompt risks overflowing the context window
+MAX_QUESTION_BATCH = 4
+
+_JSON_LIST_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+
+class RAGSystem:
+    """RAG-based Q&A system using Ollama"""
+
+    def __init__(self, vector_store: Chroma, model_name: str = "llama3.2", temperature: float = 0.3):
+        self.vector_store = vector_store
+
+        print(f"Initializing RAG with Ollama model: {model_name}")
+
+        # Direct Ollama client: persistent connection + keep_alive keeps
+        # the model resident between requests
+        self.llm = OllamaLLM(
+            model=model_name,
+            temperature=temperature,
+            num_predict=512,  # Max tokens to generate
+        )
+        
+        # Setup retriever
+        self.retriever = vector_store.as_retriever(
+            search_type="similarity",
+            search_kwargs={"k": 5}
+        )
+
+        # Memoized similarity searches: repeated and near-duplicate
+        # requests (ask then stream, summarize retries) skip the HNSW
+        # query and the query-embedding round-trip. Documents aren't
+        # hashable, so this is a plain dict keyed by (query, k) rather
+        # than lru_cache.
+        self._search_cache: Dict[tuple, List] = {}
+
+        print("✓ RAG System ready")
+
+    def _search(self, query: str, k: int) -> List:
+        """similarity_search with memoization on (query, k)"""
+        key = (query, k)
+        docs = self._search_cache.get(key)
+        if docs is None:
+            if len(self._search_cache) >= 256:
+                self._search_cache.clear()
+            docs = self.vector_store.similarity_search(query, k=k)
+            self._search_cache[key] = docs
+        return docs
+
+    def clear_search_cache(self):
+        """Drop memoized searches (call after the index changes)"""
+        self._search_cache.clear()
+
+    def _prepare(self, relevant_docs: List, with_location: bool = False):
+        """Build context and source lists in one pass over the documents
+
+        Returns (context, sources, unique_sources): the joined context
+        string, per-doc source dicts with excerpts, and source names
+        deduplicated in retrieval order.
+        """
+        context_parts = []
+        sources = []
+        source_names = []
+
+        for doc in relevant_docs:
+            metadata = doc.metadata
+            source = metadata.get('source', 'unknown')
+            page = metadata.get('page', 'N/A')
+            content = doc.page_content
+
+            if with_location:
+                context_parts.append(f"[Source: {source}, Page: {page}]\n{content}")
+            else:
+                context_parts.append(content)
+            source_names.append(source)
+            sources.append({
+                "source": source,
+                "page": page,
+                "excerpt": content[:200] + "..."
+            })
+
+        context = "\n\n".join(context_parts)
+        # dict.fromkeys dedups while keeping retrieval order deterministic
+        unique_sources = list(dict.fromkeys(source_names))
+        return context, sources, unique_sources
+
+    def ask_question(self, question: str, k: int = 5) -> Dict:
+        """Answer a question using RAG"""
+        print(f"\n{'='*50}")
+        print(f"Question: {question}")
+        print(f"{'='*50}")
+        
+        # Retrieve relevant documents
+        print("Searching for relevant content...")
+        relevant_docs = self._search(question, k)
+        
+        if not relevant_docs:
+            return {
+                "answer": "I couldn't find relevant information in your study materials.",
+                "sources": []
+            }
+        
+        print(f"✓ Found {len(relevant_docs)} relevant chunks")
+
+        # Prepare context and sources in one pass
+        context, sources, _ = self._prepare(relevant_docs, with_location=True)
+
+        # Create prompt
+        prompt = QA_PROMPT_TEMPLATE.format(context=context, question=question)
+
+        # Get answer from Ollama
+        print("Generating answer...")
+        answer = self.llm.invoke(prompt)
+
+        print("✓ Answer generated")
+
+        return {
+            "answer": answer,
+            "sources": sources
+        }
+    
+    def ask_questions(self, questions: List[str], k: int = 5) -> List[Dict]:
+        """Answer several questions in one LLM invocation
+
+        Retrieval still runs per question, but the prompts are marshaled
+        into a single numbered generation request, so a batch pays one
+        round-trip and one prefill instead of len(questions).
+        """
+        results = []
+        for start in range(0, len(questions), MAX_QUESTION_BATCH):
+            results.extend(self._ask_question_batch(questions[start:start + MAX_QUESTION_BATCH], k))
+        return results
+
+    def _ask_question_batch(self, questions: List[str], k: int) -> List[Dict]:
+        print(f"\n{'='*50}")
+        print(f"Batched Q&A: {len(questions)} questions")
+        print(f"{'='*50}")
+
+        if len(questions) == 1:
+            return [self.ask_question(questions[0], k=k)]
+
+        sections = []
+        docs_per_question = []
+        for number, question in enumerate(questions, start=1):
+            relevant_docs = self._search(question, k)
+            docs_per_question.append(relevant_docs)
+            context = "\n\n".join([doc.page_content for doc in relevant_docs])
+            sections.append(f"{number}. Context:\n{context[:2000]}\n\nQuestion {number}: {question}")
+
+        prompt = BATCH_QA_PROMPT_TEMPLATE.format(sections="\n\n".join(sections))
+
+        print("Generating batched answers...")
+        response = self.llm.invoke(prompt)
+
+        try:
+            match = _JSON_LIST_RE.search(response)
+            parsed = json.loads(match.group(0) if match else response)
+            answers = {int(item["n"]): item.get("answer", "") for item in parsed}
+        except (ValueError, KeyError, TypeError) as e:
+            # Demuxing failed - answer individually rather than guessing
+            print(f"✗ Batched answer parse failed ({e}), falling back to per-question calls")
+            return [self.ask_question(question, k=k) for question in questions]
+
+        print(f"✓ Parsed {len(answers)} batched answers")
+
+        results = []
+        for number, (question, relevant_docs) in enumerate(zip(questions, docs_per_question), start=1):
+            _, sources, _ = self._prepare(relevant_docs)
+            results.append({
+                "answer": answers.get(number, "I couldn't generate an answer for this question."),
+                "sources": sources
+            })
+        return results
+
+    def ask_question_stream(self, question: str, k: int = 5):
+        """Answer a question using RAG, yielding tokens as they are generated
+
+        Yields dicts: {"token": str} per generated token, then a final
+        {"done": True, "sources": [...]} event.
+        """
+        print(f"\n{'='*50}")
+        print(f"Question (streaming): {question}")
+        print(f"{'='*50}")
+
+        relevant_docs = self._search(question, k)
+
+        if not relevant_docs:
+            yield {"token": "I couldn't find relevant information in your study materials."}
+            yield {"done": True, "sources": []}
+            return
+
+        print(f"✓ Found {len(relevant_docs)} relevant chunks")
+
+        context, sources, _ = self._prepare(relevant_docs, with_location=True)
+
+        prompt = QA_PROMPT_TEMPLATE.format(context=context, question=question)
+
+        # Stream tokens as Ollama generates them
+        print("Streaming answer...")
+        for token in self.llm.stream(prompt):
+            yield {"token": token}
+
+        print("✓ Answer streamed")
+
+        yield {"done": True, "sources": sources}
+
+    def summarize(self, query: str = None, summary_type: str = "bullets", k: int = 10) -> Dict:
+        """Summarize content from the knowledge base"""
+        print(f"\n{'='*50}")
+        print(f"Summarization Request: {summary_type}")
+        print(f"{'='*50}")
+        
+        if query:
+            print(f"Topic: {query}")
+            relevant_docs = self._search(query, k)
+        else:
+            print("Generating general summary")
+            # Get diverse chunks for general summary
+            relevant_docs = self._search("overview main concepts key topics", k)
+        
+        if not relevant_docs:
+            return {
+                "summary": "No content found to summarize.",
+                "sources": []
+            }
+        
+        print(f"✓ Found {len(relevant_docs)} relevant chunks")
+        
+        # Prepare context and deduplicated sources in one pass
+        context, _, sources = self._prepare(relevant_docs)
+
+        # Create prompt
+        prompt = SUMMARIZATION_PROMPT_TEMPLATE.format(
+            context=context[:4000],  # Limit context size
+            summary_type=summary_type
+        )
+
+        # Generate summary
+        print("Generating summary...")
+        summary = self.llm.invoke(prompt)
+
+        print("✓ Summary generated")
+
+        return {
+            "summary": summary,
+            "sources": sources
+        }
+    
+    def extract_definitions(self, query: str = "definitions terms concepts", k: int = 10) -> Dict:
+        """Extract key definitions from content"""
+        print(f"\n{'='*50}")
+        print("Extracting Definitions")
+        print(f"{'='*50}")
+        
+        relevant_docs = self._search(query, k)
+        
+        if not relevant_docs:
+            return {
+                "definitions": "No definitions found.",
+                "sources": []
+            }
+        
+        print(f"✓ Found {len(relevant_docs)} relevant chunks")
+        
+        context, _, sources = self._prepare(relevant_docs)
+        prompt = DEFINITION_EXTRACTION_PROMPT.format(context=context[:4000])
+
+        print("Extracting definitions...")
+        definitions = self.llm.invoke(prompt)
+
+        print("✓ Definitions extracted")
+
+        return {
+            "definitions": definitions,
+            "sources": sources
+        }
+
+
+# Test the module
+if __name__ == "__main__":
+    print("RAG System Module - Ready!")
+    print("\nTo test:")
+    print("1. First create a vector store using ingestion.py")
+    print("2. Then run:")
+    print("\n  from src.ingestion import DocumentIngestion")
+    print("  from src.rag import RAGSystem")
+    print("  ingestion = DocumentIngestion()")
+    print("  vector_store = ingestion.load_vector_store('test_store')")
+    print("  rag = RAGSystem(vector_store)")
+    print("  result = rag.ask_question('What is machine learning?')")
     print("  print(result['answer'])")
\ No newline at end of file